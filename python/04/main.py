@@ -1,60 +1,117 @@
 import numpy as np
 
 
+def line_complete(marks):
+    """
+    Whether each board in marks has a complete row or column.
+    >>> line_complete(np.array([[[1, 0], [1, 0]], [[1, 0], [0, 1]]], dtype=bool)).tolist()
+    [True, False]
+    """
+    return marks.all(axis=2).any(axis=1) | marks.all(axis=1).any(axis=1)
+
+
 def get_winning_board(boards, draws):
-    board_marks = np.zeros((len(boards), *boards[0].shape))
-    board_rows = np.zeros((len(boards), boards[0].shape[0]))
-    board_cols = np.zeros((len(boards), boards[0].shape[1]))
+    board_marks = np.zeros(boards.shape, dtype=bool)
 
     for draw in draws:
-        for i, board in enumerate(boards):
-            for j, row in enumerate(board):
-                for k, cell in enumerate(row):
-                    if cell == draw:
-                        board_marks[i, j, k] += 1
-                        board_rows[i, j] += 1
-                        board_cols[i, k] += 1
-                        if board_rows[i, j] == 5 or board_cols[i, k] == 5:
-                            return i, draw, np.multiply(1 - board_marks[i], boards[i]).sum()
-        print(f"{draw=}: {board_rows=} {board_cols=}")
+        board_marks |= boards == draw
+        if (complete := line_complete(board_marks)).any():
+            i = int(np.argmax(complete))
+            return i, draw, int(boards[i][~board_marks[i]].sum())
 
 
 def get_losing_board(boards, draws):
-    board_marks = np.zeros((len(boards), *boards[0].shape))
-    board_rows = np.zeros((len(boards), boards[0].shape[0]))
-    board_cols = np.zeros((len(boards), boards[0].shape[1]))
-    boards_complete = np.zeros(len(boards))
+    board_marks = np.zeros(boards.shape, dtype=bool)
+    boards_complete = np.zeros(len(boards), dtype=bool)
 
     for draw in draws:
-        for i, board in enumerate(boards):
-            if boards_complete[i]:
-                continue
-            for j, row in enumerate(board):
-                for k, cell in enumerate(row):
-                    if cell == draw:
-                        print(f"bingo for {draw=}! {i=} {j=} {k=}")
-                        board_marks[i, j, k] += 1
-                        board_rows[i, j] += 1
-                        board_cols[i, k] += 1
-                        if board_rows[i, j] == 5 or board_cols[i, k] == 5:
-                            boards_complete[i] = 1
-                            if boards_complete.sum() == len(boards):
-                                return i, draw, np.multiply(1 - board_marks[i], boards[i]).sum()
-                        break
-        print(f"{draw=}: {board_rows=} {board_cols=}")
-
-def main(input):
-    draw_str, boards_str = input.split('\n', 1)
-    draws = np.array([int(n) for n in draw_str.split(',')])
-    board_str_lines = np.array([line for line in boards_str.split('\n') if line])
-    boards = []
-    for board_str_lines in np.split(board_str_lines, board_str_lines.shape[0]//5):
-        board = np.array([[int(n) for n in line.split()] for line in board_str_lines])
-        boards.append(board)
-
-    winning_board, winning_draw, winning_unmarked = get_winning_board(boards, draws)
+        board_marks |= boards == draw
+        if (complete := line_complete(board_marks)).all():
+            # the last of the boards which were completed by this draw
+            i = len(boards) - 1 - int(np.argmax((complete & ~boards_complete)[::-1]))
+            return i, draw, int(boards[i][~board_marks[i]].sum())
+        boards_complete = complete
+
+
+def draw_turns(boards, draws):
+    """
+    Map every cell of boards to the index in draws at which it is first drawn, or len(draws) if it
+    is never drawn, with one lookup table indexed by cell value.
+    >>> draw_turns(np.array([[[5, 1], [3, 7]]]), np.array([3, 5, 3, 1])).tolist()
+    [[[1, 3], [0, 4]]]
+    """
+    lookup = np.full(max(boards.max(), draws.max()) + 1, len(draws))
+    # assign in reverse so the first draw of a repeated number wins
+    lookup[draws[::-1]] = np.arange(len(draws))[::-1]
+    return lookup[boards]
+
+
+def winning_turns(turns):
+    """
+    The turn at which each board wins: each row and column completes at the latest turn of its
+    cells, and each board at the earliest of its rows and columns.
+    >>> winning_turns(np.array([[[1, 3], [0, 4]]])).tolist()
+    [1]
+    """
+    lines = np.concatenate([turns.max(axis=2), turns.max(axis=1)], axis=1)
+    return lines.min(axis=1)
+
+
+def board_score(boards, turns, draws, board, turn):
+    unmarked = int(boards[board][turns[board] > turn].sum())
+    return board, draws[turn], unmarked
+
+
+def get_winning_and_losing_boards(boards, draws):
+    """
+    Like get_winning_board and get_losing_board, vectorized over all the boards at once. Ties go
+    the same way: the first board to win, and the last board of those that win last.
+    """
+    boards = np.asarray(boards)
+    turns = draw_turns(boards, draws)
+    board_turns = winning_turns(turns)
+    winning_board = int(np.argmin(board_turns))
+    losing_board = len(board_turns) - 1 - int(np.argmax(board_turns[::-1]))
+    return (
+        board_score(boards, turns, draws, winning_board, board_turns[winning_board]),
+        board_score(boards, turns, draws, losing_board, board_turns[losing_board]),
+    )
+
+
+def parse(input):
+    """
+    Parse the draws, and the boards stacked into one (boards, height, width) tensor sized by the
+    first board. All the numbers of each are converted in one np.fromstring pass, with no
+    intermediate lists of lines or tokens.
+    >>> draws, boards = parse("3,1,2\\n\\n1 2 3\\n4 5 6\\n\\n 7  8  9\\n10 11 12\\n")
+    >>> draws.tolist(), boards.shape, boards[1, 0].tolist()
+    ([3, 1, 2], (2, 2, 3), [7, 8, 9])
+    >>> parse("3\\n\\n1 2\\n3 4\\n")[1].shape
+    (1, 2, 2)
+    """
+    draw_str, boards_str = input.strip().split('\n', 1)
+    draws = np.fromstring(draw_str, dtype=int, sep=',')
+    boards_str = boards_str.lstrip()
+    end_of_first_board = boards_str.find('\n\n')
+    first_board = boards_str[:end_of_first_board] if end_of_first_board >= 0 else boards_str
+    height = first_board.count('\n') + 1
+    width = len(first_board.split('\n', 1)[0].split())
+    # fromstring's whitespace separator also matches newlines and repeated spaces
+    boards = np.fromstring(boards_str, dtype=int, sep=' ')
+    return draws, boards.reshape(-1, height, width)
+
+
+def main(input, simulate=False):
+    draws, boards = parse(input)
+
+    if simulate:
+        winning = get_winning_board(boards, draws)
+        losing = get_losing_board(boards, draws)
+    else:
+        winning, losing = get_winning_and_losing_boards(boards, draws)
+    winning_board, winning_draw, winning_unmarked = winning
+    losing_board, losing_draw, losing_unmarked = losing
     print(f"{winning_board=} {winning_draw=} {winning_unmarked=} {winning_unmarked*winning_draw=}")
-    losing_board, losing_draw, losing_unmarked = get_losing_board(boards, draws)
     print(f"{losing_board=} {losing_draw=} {losing_unmarked=} {losing_unmarked*losing_draw=}")
     
 main("""7,4,9,5,11,17,23,2,0,14,21,24,10,16,13,6,15,25,12,22,18,20,8,19,3,26,1
@@ -1,46 +1,183 @@
+import re
 import unittest
 import numpy as np
+from itertools import combinations
+
+def rasterize(segments):
+    """
+    Flat (x, y) coordinates of every cell covered by each horizontal, vertical or diagonal
+    segment (x1, y1, x2, y2), generated for all segments at once: each segment steps by the sign
+    of its deltas for as many cells as its longest delta.
+    """
+    segments = np.asarray(segments).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx, dy = x2 - x1, y2 - y1
+    supported = (dx == 0) | (dy == 0) | (np.abs(dx) == np.abs(dy))
+    if not supported.all():
+        print(f"not supported: {segments[~supported].tolist()=}")
+        exit(1)
+    lengths = np.maximum(np.abs(dx), np.abs(dy)) + 1
+    # the index of each cell within its own segment
+    steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    xs = np.repeat(x1, lengths) + steps * np.repeat(np.sign(dx), lengths)
+    ys = np.repeat(y1, lengths) + steps * np.repeat(np.sign(dy), lengths)
+    return xs, ys
+
+
+def draw_segments(grid, segments):
+    xs, ys = rasterize(segments)
+    grid += np.bincount(xs * grid.shape[1] + ys, minlength=grid.size).reshape(grid.shape)
 
-def get_range(v1, v2):
-    if v2 < v1:
-        return range(v1, v2 -1, -1)
-    else:
-        return range(v1, v2 + 1)
 
 def draw_grid(grid, x1, y1, x2, y2):
-    if x1 == x2:
-        for y in get_range(y1, y2):
-            grid[x1, y] += 1
-    elif y1 == y2:
-        for x in get_range(x1, x2):
-            grid[x, y1] += 1
-    elif abs(y2 - y1) == abs(x2 - x1):
-        for x, y in zip(get_range(x1, x2), get_range(y1, y2)):
-            grid[x, y] += 1
-    else:
-        print(f"not supported: {[x1, y1, x2, y2]=}")
+    draw_segments(grid, [x1, y1, x2, y2])
+
+
+# Each family of parallel segments as the origin and direction of the cell at parameter t on the
+# line with key k, where t is the segment's x (or y for vertical segments):
+# horizontal (y = k), vertical (x = k), diagonal (x - y = k) and antidiagonal (x + y = k).
+FAMILIES = {
+    'horizontal': (lambda k: (0 * k, k), (1, 0)),
+    'vertical': (lambda k: (k, 0 * k), (0, 1)),
+    'diagonal': (lambda k: (0 * k, -k), (1, 1)),
+    'antidiagonal': (lambda k: (0 * k, k), (1, -1)),
+}
+
+# The key of the line of each family through the cell (x, y)
+FAMILY_KEYS = {
+    'horizontal': lambda x, y: y,
+    'vertical': lambda x, y: x,
+    'diagonal': lambda x, y: x - y,
+    'antidiagonal': lambda x, y: x + y,
+}
+
+
+def family_pieces(segments):
+    """
+    Split segments into their families, and within each family sweep the segments on each line
+    to find the maximal pieces (key, start, end, count) covered by the same number of segments.
+    Events are sorted by (key, position), so a running sum of +1 starts and -1 ends gives the
+    coverage of every line at once.
+    """
+    segments = np.asarray(segments).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx, dy = x2 - x1, y2 - y1
+    families = {
+        'horizontal': ((dy == 0) & (dx != 0), y1, x1, x2),
+        'vertical': (dx == 0, x1, y1, y2),
+        'diagonal': ((dx == dy) & (dx != 0), x1 - y1, x1, x2),
+        'antidiagonal': ((dx == -dy) & (dx != 0), x1 + y1, x1, x2),
+    }
+    supported = sum(mask for mask, *_ in families.values()).astype(bool)
+    if not supported.all():
+        print(f"not supported: {segments[~supported].tolist()=}")
         exit(1)
+    pieces = {}
+    for family, (mask, keys, t1, t2) in families.items():
+        keys = np.tile(keys[mask], 2)
+        positions = np.concatenate([np.minimum(t1, t2)[mask], np.maximum(t1, t2)[mask] + 1])
+        deltas = np.repeat([1, -1], mask.sum())
+        order = np.lexsort([positions, keys])
+        keys, positions = keys[order], positions[order]
+        counts = np.cumsum(deltas[order])
+        # the piece from each event to the next on the same line
+        piece = (counts[:-1] > 0) & (positions[:-1] < positions[1:]) & (keys[:-1] == keys[1:])
+        pieces[family] = (
+            keys[:-1][piece], positions[:-1][piece], positions[1:][piece] - 1, counts[:-1][piece]
+        )
+    return pieces
+
+
+def count_overlaps(segments, block_size=2 ** 20):
+    """
+    The number of cells covered by at least two segments, without a grid. Cells covered twice
+    within a family are counted from the lengths of their pieces. Pieces of different families
+    meet in at most one cell, on a line of the other family whose key lies between the keys through
+    the piece's two ends. So the other family's pieces are sorted by key, and only those found in
+    that range with np.searchsorted are solved for a crossing, about block_size pairs at a time.
+    Every crossing cell is then counted once, less the families that already counted it.
+    Memory scales with the number of segments and candidate pairs, not with the coordinates, but
+    the candidates can still grow quadratically when long pieces span the lines of many pieces
+    that stop short of them (e.g. a long horizontal above a row of short verticals).
+    """
+    pieces = family_pieces(segments)
+    total = sum(int((end - start + 1)[count > 1].sum()) for _, start, end, count in pieces.values())
+    xs, ys, counted_by = [], [], []
+    for (bit1, (family1, piece1)), (bit2, (family2, piece2)) in combinations(enumerate(pieces.items()), 2):
+        (origin1, (dx1, dy1)), (origin2, (dx2, dy2)) = FAMILIES[family1], FAMILIES[family2]
+        keys1, starts1, ends1, counts1 = piece1
+        keys2, starts2, ends2, counts2 = (a[np.argsort(piece2[0], kind='stable')] for a in piece2)
+        ox1, oy1 = origin1(keys1)
+        key2 = FAMILY_KEYS[family2]
+        first = key2(ox1 + starts1 * dx1, oy1 + starts1 * dy1)
+        last = key2(ox1 + ends1 * dx1, oy1 + ends1 * dy1)
+        lo = np.searchsorted(keys2, np.minimum(first, last))
+        candidates = np.searchsorted(keys2, np.maximum(first, last), side='right') - lo
+        # split the pieces into blocks of about block_size candidate pairs
+        stops = np.searchsorted(
+            np.cumsum(candidates), np.arange(block_size, candidates.sum(), block_size), side='right'
+        )
+        bounds = [0, *np.unique(stops).tolist(), len(candidates)]
+        det = dx1 * dy2 - dy1 * dx2
+        for block_start, block_end in zip(bounds[:-1], bounds[1:]):
+            n = candidates[block_start:block_end]
+            i = np.repeat(np.arange(block_start, block_end), n)
+            # each piece's candidates are the run of family2 pieces from its lo
+            j = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n - lo[block_start:block_end], n)
+            ox2, oy2 = origin2(keys2[j])
+            # cramer's rule for origin1 + t1 * direction1 == origin2 + t2 * direction2
+            t1, r1 = np.divmod((ox2 - ox1[i]) * dy2 - (oy2 - oy1[i]) * dx2, det)
+            t2 = ((ox2 - ox1[i]) * dy1 - (oy2 - oy1[i]) * dx1) // det
+            meet = (
+                (r1 == 0) & (starts1[i] <= t1) & (t1 <= ends1[i]) & (starts2[j] <= t2) & (t2 <= ends2[j])
+            )
+            i, j, t1 = i[meet], j[meet], t1[meet]
+            xs.append(ox1[i] + t1 * dx1)
+            ys.append(oy1[i] + t1 * dy1)
+            counted_by.append(((counts1[i] > 1) << bit1) | ((counts2[j] > 1) << bit2))
+    xs, ys, counted_by = map(np.concatenate, [xs, ys, counted_by])
+    if not len(xs):
+        return total
+    # merge the families that counted each crossing cell, over every pair of families
+    order = np.lexsort([ys, xs])
+    xs, ys, counted_by = xs[order], ys[order], counted_by[order]
+    cells = np.flatnonzero(np.concatenate([[True], (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])]))
+    counted_by = np.bitwise_or.reduceat(counted_by, cells)
+    # each crossing cell should count once, but was counted by every family covering it twice
+    return total + len(cells) - int(sum((counted_by >> bit) & 1 for bit in range(len(FAMILIES))).sum())
+
+
+# Matches every line which isn't a segment
+MALFORMED = re.compile(r'^(?!\d+,\d+ -> \d+,\d+$).*$', re.MULTILINE)
+
+
+def parse(input):
+    """
+    Parse the input into an (n, 4) int array of segments, along with a mask of which lines were
+    well formed (malformed lines are left as 0s). One regex pass finds the malformed lines, then
+    every number is converted in one np.fromstring pass.
+    """
+    text = input.strip()
+    starts = [match.start() for match in MALFORMED.finditer(text)]
+    newlines = np.flatnonzero(np.frombuffer(text.encode(), dtype=np.uint8) == ord('\n'))
+    valid = np.ones(len(newlines) + 1, dtype=bool)
+    valid[np.searchsorted(newlines, starts)] = False
+    text = MALFORMED.sub('0,0 -> 0,0', text).replace(' -> ', ',').replace('\n', ',')
+    return np.fromstring(text, dtype=int, sep=',').reshape(-1, 4), valid
+
+
+def main(input, sweep=False):
+    lines, valid = parse(input)
+    if not valid.all():
+        print(f"invalid lines: {(np.flatnonzero(~valid) + 1).tolist()}")
+        exit(1)
+
+    if sweep:
+        return count_overlaps(lines)
 
-def main(input):
-    lines = []
-    max_x = 0
-    max_y = 0
-    for line in input.splitlines():
-        tokens = line.split()
-        if tokens[1] != '->':
-            print(f"invalid {line=}")
-            exit(1)
-        numbers = [int(t) for t in [
-            *tokens[0].split(','),
-            *tokens[2].split(',')
-        ]]
-        max_x = max([max_x, numbers[0], numbers[2]])
-        max_y = max([max_y, numbers[1], numbers[3]])
-        lines.append(numbers)
-    
+    max_x, max_y = lines[:, [0, 2]].max(), lines[:, [1, 3]].max()
     grid = np.zeros((max_x + 1, max_y + 1), dtype=int)
-    for line in lines:
-        draw_grid(grid, *line)
+    draw_segments(grid, lines)
     print(f"{grid.transpose()=}")
     return (grid > 1).sum()
 
@@ -98,6 +235,22 @@ class TestSuide(unittest.TestCase):
             [0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
         ])
         
+    def test_rasterize(self):
+        # 1,1 -> 1,3 and 9,7 -> 7,9
+        xs, ys = rasterize([[1, 1, 1, 3], [9, 7, 7, 9]])
+        self.assertEqual(xs.tolist(), [1, 1, 1, 9, 8, 7])
+        self.assertEqual(ys.tolist(), [1, 2, 3, 7, 8, 9])
+
+    def test_draw_segments_overlap(self):
+        # 0,0 -> 2,2 and 0,2 -> 2,0 cross at 1,1, and 0,1 -> 2,1 crosses both there
+        grid = np.zeros((3, 3), dtype=int)
+        draw_segments(grid, [[0, 0, 2, 2], [0, 2, 2, 0], [0, 1, 2, 1]])
+        self.assertEqual(grid.tolist(), [
+            [1, 1, 1],
+            [0, 3, 0],
+            [1, 1, 1]
+        ])
+
     @unittest.skip("skip")
     def test_main_p1(self):
         self.assertEqual(main("""0,9 -> 5,9
@@ -122,6 +275,38 @@ class TestSuide(unittest.TestCase):
 3,4 -> 1,4
 0,0 -> 8,8
 5,5 -> 8,2"""), 12)
+
+    def test_main_p2_sweep(self):
+        self.assertEqual(main("""0,9 -> 5,9
+8,0 -> 0,8
+9,4 -> 3,4
+2,2 -> 2,1
+7,0 -> 7,4
+6,4 -> 2,0
+0,9 -> 2,9
+3,4 -> 1,4
+0,0 -> 8,8
+5,5 -> 8,2""", sweep=True), 12)
+
+    def test_parse(self):
+        segments, valid = parse("0,9 -> 5,9\n8,0 => 0,8\n\n10,4 -> 3,40\n")
+        self.assertEqual(segments.tolist(), [[0, 9, 5, 9], [0, 0, 0, 0], [0, 0, 0, 0], [10, 4, 3, 40]])
+        self.assertEqual(valid.tolist(), [True, False, False, True])
+
+    def test_count_overlaps_crossing(self):
+        # 1,0 -> 1,4 twice and 0,0 -> 4,4 twice overlap along both lines, and cross at 1,1
+        self.assertEqual(count_overlaps([[1, 0, 1, 4], [1, 4, 1, 0], [0, 0, 4, 4], [4, 4, 0, 0]]), 9)
+        # 0,2 -> 4,2 crosses both lines once, at 1,2 and 2,2
+        self.assertEqual(count_overlaps([[1, 0, 1, 4], [0, 0, 4, 4], [0, 2, 4, 2]]), 3)
+
+    def test_count_overlaps_blocks(self):
+        # verticals on the lines under 0,5 -> 9,5 that stop short of it, bar the one at 6, and
+        # 0,0 -> 5,5 meeting them all on the diagonal
+        segments = [[0, 5, 9, 5], [0, 0, 5, 5]] + [[x, 0, x, 3] for x in range(10)] + [[6, 2, 6, 7]]
+        grid = np.zeros((10, 10), dtype=int)
+        draw_segments(grid, segments)
+        for block_size in [1, 3, 2 ** 20]:
+            self.assertEqual(count_overlaps(segments, block_size), (grid > 1).sum())
         
 
 if __name__ == '__main__':
@@ -1,4 +1,5 @@
 import numpy as np
+from collections import deque
 
 
 def cycle(histogram):
@@ -6,7 +7,7 @@ def cycle(histogram):
     >>> cycle({1: 1, 2: 1, 3: 2, 4: 1})
     {0: 1, 1: 1, 2: 2, 3: 1}
     >>> cycle({0: 1, 1: 1, 2: 2, 3: 1})
-    {0: 1, 1: 2, 1: 2, 6: 1, 8: 1}
+    {6: 1, 8: 1, 0: 1, 1: 2, 2: 1}
     """
 
     next_histogram = {}
@@ -18,15 +19,56 @@ def cycle(histogram):
             next_histogram[k - 1] = v + next_histogram.get(k - 1, 0)
     return next_histogram
 
-def main(input):
-    histogram = {}
-    for v in map(int, input.split(',')):
-        histogram[v] = histogram.get(v, 0) + 1
-    for i in range(256):
-        print(f"{i=} {sum(histogram.values())}, {sorted(histogram.items())=}")
-        histogram = cycle(histogram)
-    return sum(histogram.values())
-    
+def rotate(counts):
+    """
+    Like cycle, but for a deque of the number of fish with each timer value from 0 to 8, updated
+    in place.
+    >>> counts = deque([1, 1, 2, 1, 0, 0, 0, 0, 0])
+    >>> rotate(counts)
+    >>> counts
+    deque([1, 2, 1, 0, 0, 0, 1, 0, 1])
+    """
+    counts.rotate(-1)
+    counts[6] += counts[8]
+
+
+# CYCLE_MATRIX @ counts is a day later than counts: each timer counts down into the one below,
+# and timer 0 fish reset to 6 and spawn a new fish at 8.
+CYCLE_MATRIX = np.zeros((9, 9), dtype=object)
+CYCLE_MATRIX[range(8), range(1, 9)] = 1
+CYCLE_MATRIX[6, 0] = CYCLE_MATRIX[8, 0] = 1
+
+
+def cycle_power(counts, days):
+    """
+    Apply CYCLE_MATRIX days times to counts, by squaring it in O(log days) matrix products of exact
+    python ints.
+    >>> cycle_power([1, 1, 2, 1, 0, 0, 0, 0, 0], 1).tolist()
+    [1, 2, 1, 0, 0, 0, 1, 0, 1]
+    >>> sum(cycle_power([0, 1, 1, 2, 1, 0, 0, 0, 0], 256))
+    26984457539
+    """
+    counts = np.array(counts, dtype=object)
+    matrix = CYCLE_MATRIX
+    while days:
+        if days & 1:
+            counts = matrix @ counts
+        days >>= 1
+        if days:
+            matrix = matrix @ matrix
+    return counts
+
+
+def main(input, days=256, mode='rotate', trace=False):
+    counts = np.bincount(np.array(input.split(','), dtype=int), minlength=9).tolist()
+    if mode == 'power':
+        return sum(cycle_power(counts, days))
+    counts = deque(counts)
+    for i in range(days):
+        if trace:
+            print(f"{i=} {sum(counts)}, {counts=}")
+        rotate(counts)
+    return sum(counts)
 
 if __name__ == "__main__":
     print(cycle({1: 1, 2: 1, 3: 2, 4: 1}))
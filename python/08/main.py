@@ -1,5 +1,4 @@
-from more_itertools import partition, split_at
-from functools import reduce
+import numpy as np
 
 #           [abcdefg]
 # len2:
@@ -46,6 +45,10 @@ from functools import reduce
 # => if count(num3 & len6) == 5: len6 is num9
 
 
+# maps each segment letter's byte to its bit, and any other byte to 0
+BITMASK_TABLE = bytes(1 << (ord('g') - byte) if ord('a') <= byte <= ord('g') else 0 for byte in range(256))
+
+
 def letters_to_bitmask(letters):
     """
     >>> bin(letters_to_bitmask("acde"))
@@ -53,10 +56,17 @@ def letters_to_bitmask(letters):
     >>> bin(letters_to_bitmask("bde"))
     '0b101100'
     """
-    return sum([
-        1 << (ord('g') - ord(c))
-        for c in letters
-    ])
+    # a pattern never repeats a letter, so summing its bits is the same as or-ing them
+    return sum(letters.encode().translate(BITMASK_TABLE))
+
+
+def line_masks(line):
+    """
+    The bitmasks of a line's patterns, in order, translating the whole line in one go.
+    >>> line_masks("ab cd | bde acde")
+    [96, 24, 44, 92]
+    """
+    return [sum(bits) for bits in line.encode().translate(BITMASK_TABLE).split(b'\0') if bits]
 
 
 def mask_count(mask):
@@ -72,51 +82,100 @@ TRIVIAL_TRANSLATIONS = {
 }
 
 
-def main(input):
+# The segments lit for each digit, in the standard wiring
+DIGIT_SEGMENTS = ['abcefg', 'cf', 'acdeg', 'acdfg', 'bcdf', 'abdfg', 'abdefg', 'acf', 'abcdefg', 'abcdfg']
+
+
+def signature(mask, one, four, seven):
+    """
+    A signature of a pattern's bitmask which doesn't depend on how the segments are wired: its
+    length, and how many segments it has in common with the 1, 4 and 7 patterns.
+    """
+    return mask_count(mask), mask_count(mask & one), mask_count(mask & four), mask_count(mask & seven)
+
+
+# maps the signature of every digit's pattern to the digit
+DECODING_TABLE = {
+    signature(letters_to_bitmask(segments), *map(letters_to_bitmask, ['cf', 'bcdf', 'acf'])): digit
+    for digit, segments in enumerate(DIGIT_SEGMENTS)
+}
+
+
+def decode(line):
+    """
+    Decode the output digits of a display line by looking up their signatures, relative to the 1,
+    4 and 7 patterns, which are the only patterns with 2, 4 and 3 segments.
+    >>> decode("acedgfb cdfbe gcdfa fbcad dab cefabd cdfgeb eafb cagedb ab | cdfeb fcadb cdfeb cdbaf")
+    [5, 3, 5, 3]
+    """
+    masks = line_masks(line)
+    masks_by_length = {mask_count(mask): mask for mask in masks[:10]}
+    one, four, seven = masks_by_length[2], masks_by_length[4], masks_by_length[3]
+    return [DECODING_TABLE[signature(mask, one, four, seven)] for mask in masks[10:]]
+
+
+# the number of segments in each 7-bit mask
+POPCOUNT = np.array([mask_count(mask) for mask in range(128)], dtype=np.uint8)
+
+# DECODING_TABLE as an array, indexed by a signature's digits in mixed radix (8, 3, 5, 4)
+DECODING_ARRAY = np.full(8 * 3 * 5 * 4, -1, dtype=np.int64)
+for (length, ones, fours, sevens), digit in DECODING_TABLE.items():
+    DECODING_ARRAY[((length * 3 + ones) * 5 + fours) * 4 + sevens] = digit
+
+
+def parse_masks(input):
+    """
+    The bitmasks of every line's 10 signal patterns and 4 output patterns, as an (n_lines, 14)
+    array.
+    >>> parse_masks("ab cd | bde acde\\nabc d | e fg").tolist()
+    [[96, 24, 44, 92], [112, 8, 4, 3]]
+    """
+    bits = np.frombuffer(BITMASK_TABLE, dtype=np.uint8)[np.frombuffer(input.encode(), dtype=np.uint8)]
+    # a pattern starts at every segment letter that doesn't follow another one
+    letters = bits != 0
+    starts = np.flatnonzero(letters & ~np.concatenate([[False], letters[:-1]]))
+    n_lines = input.count('\n') + (not input.endswith('\n'))
+    return np.bitwise_or.reduceat(bits, starts).reshape(n_lines, -1)
+
+
+def decode_batch(masks):
+    """
+    Like decode, for every line of an (n_lines, 14) array of masks at once, giving the output
+    numbers as an array.
+    >>> decode_batch(parse_masks("acedgfb cdfbe gcdfa fbcad dab cefabd cdfgeb eafb cagedb ab | cdfeb fcadb cdfeb cdbaf")).tolist()
+    [5353]
+    """
+    signals, outputs = masks[:, :10], masks[:, 10:]
+    lengths = POPCOUNT[signals]
+    # each of 1, 4 and 7 is the only signal pattern of its length on its line
+    one, four, seven = (
+        np.where(lengths == length, signals, 0).max(axis=1, keepdims=True)
+        for length in [2, 4, 3]
+    )
+    signatures = (
+        (POPCOUNT[outputs].astype(np.int64) * 3 + POPCOUNT[outputs & one]) * 5
+        + POPCOUNT[outputs & four]
+    ) * 4 + POPCOUNT[outputs & seven]
+    return DECODING_ARRAY[signatures] @ np.array([1000, 100, 10, 1])
+
+
+def main(input, batch=False):
+    if batch:
+        masks = parse_masks(input)
+        num_trivial_digits = int(np.isin(POPCOUNT[masks[:, 10:]], list(TRIVIAL_TRANSLATIONS)).sum())
+        total_output = int(decode_batch(masks).sum())
+        print(f"{num_trivial_digits=} {total_output=}")
+        return num_trivial_digits, total_output
+
     num_trivial_digits = 0
     total_output = 0
-    for i, line in enumerate(input.splitlines()):
-        # split line by whitespace, then order each token alphabetically, and split on the pipe
-        signal_patterns, out_patterns = split_at(map(lambda p: ''.join(sorted(p)),line.split()), "|".__eq__)
-        # maps patterns to their output number
-        pattern_translations = {}
-        # maps known output numbers to their bitmask
-        num_masks = {}
-        # groups patterns by their length
-        patterns_by_length = reduce(lambda d, p: d.setdefault(len(p), []).append(p) or d, signal_patterns, {})
-        # get trivial translations
-        for length, number in TRIVIAL_TRANSLATIONS.items():
-            [pattern] = patterns_by_length.pop(length)
-            pattern_translations[pattern] = number
-            num_masks[number] = letters_to_bitmask(pattern)
-
-        # See notes above for heuristic derivations.
-        for length, number, predicate in [
-            # a len5 pattern is a num3 if it has 3 segments in common with num7
-            (5, 3, lambda p: mask_count(letters_to_bitmask(p) & num_masks[7]) == 3),
-            # a len5 pattern is a num5 if it has 2 segments in common with num4 and is not a num3
-            (5, 2, lambda p: mask_count(letters_to_bitmask(p) & num_masks[4]) == 2),
-            # the remaining len5 pattern is num2
-            (5, 5, lambda p: p),
-            # a len6 pattern is a num6 if its inverse has 1 segment in common with num1
-            (6, 6, lambda p: mask_count(~letters_to_bitmask(p) & num_masks[1]) == 1),
-            # a len6 pattern is a num9 if it has 5 segments in common with num3
-            (6, 9, lambda p: mask_count(letters_to_bitmask(p) & num_masks[3]) == 5),
-            # the remaining len6 pattern is num0
-            (6, 0, lambda p: p)
-        ]:
-            patterns_by_length[length], [pattern] = [*map(list,partition(predicate, patterns_by_length[length]))]
-            pattern_translations[pattern] = number
-            num_masks[number] = letters_to_bitmask(pattern)
-
-        output_number = 0
-        for j, pattern in enumerate(reversed(out_patterns)):
-            if len(pattern) in TRIVIAL_TRANSLATIONS:
-                num_trivial_digits += 1
-            output_number += (10 ** j) * pattern_translations[pattern]
-        total_output += output_number
+    for line in input.splitlines():
+        digits = decode(line)
+        num_trivial_digits += sum(digit in TRIVIAL_TRANSLATIONS.values() for digit in digits)
+        total_output += sum((10 ** j) * digit for j, digit in enumerate(reversed(digits)))
 
     print(f"{num_trivial_digits=} {total_output=}")
+    return num_trivial_digits, total_output
 
 
 EXAMPLE = """be cfbegad cbdgef fgaecd cgeb fdcge agebfd fecdb fabcd edb | fdgacbe cefdb cefbgd gcbe
@@ -1,7 +1,6 @@
 import numpy as np
 from numpy.core.fromnumeric import prod
 import networkx as nx
-from itertools import product
 
 
 def get_neighbors(i, j, h, w):
@@ -13,17 +12,39 @@ def get_neighbors(i, j, h, w):
     ])
 
 
+def parse(input):
+    """
+    Read the height map straight from the input's bytes, keeping one byte per height.
+    >>> height_map = parse("219\\n398")
+    >>> height_map.tolist(), height_map.dtype
+    ([[2, 1, 9], [3, 9, 8]], dtype('uint8'))
+    """
+    width = input.index('\n') if '\n' in input else len(input)
+    raw = np.frombuffer(input.rstrip('\n').encode() + b'\n', dtype=np.uint8)
+    return raw.reshape(-1, width + 1)[:, :width] - ord('0')
+
+
+def find_low_points(height_map):
+    """
+    The row and column indices of the points lower than all their neighbors, comparing the height
+    map with its four shifts. The border is padded with a height above 9, so it never blocks a low
+    point.
+    >>> [index.tolist() for index in find_low_points(np.array([[2, 1, 9], [3, 9, 8]]))]
+    [[0, 1], [1, 2]]
+    """
+    pad = np.pad(height_map, 1, constant_values=10)
+    inner = pad[1:-1, 1:-1]
+    return np.nonzero(
+        (inner < pad[:-2, 1:-1]) & (inner < pad[2:, 1:-1])
+        & (inner < pad[1:-1, :-2]) & (inner < pad[1:-1, 2:])
+    )
+
+
 def main(input):
-    height_map = np.array([[int(c) for c in line] for line in input.splitlines()])
-    low_points = []
-    for i, j in product(*map(range, height_map.shape)):
-        height = height_map[i][j]
-        if all([
-            height_map[k][l] > height
-            for k, l in get_neighbors(i, j, *height_map.shape)
-        ]):
-            low_points.append((height, i, j))
-    risk = sum(map(lambda x: x[0] + 1, low_points))
+    height_map = parse(input)
+    rows, cols = find_low_points(height_map)
+    low_points = list(zip(height_map[rows, cols].tolist(), rows.tolist(), cols.tolist()))
+    risk = int(height_map[rows, cols].sum(dtype=np.int64)) + len(rows)
 
     # create a flow network:
     graph = nx.Graph()
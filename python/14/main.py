@@ -15,6 +15,7 @@ import numpy as np
 import networkx as nx
 from more_itertools import windowed
 from collections import Counter
+from itertools import chain, product
 
 def apply_rules(pair_count, rules):
     new_pair_count = Counter()
@@ -39,17 +40,123 @@ def score(pair_count, template_first, template_last):
     print("top_elements", top_elements)
     return top_elements[0][1] - top_elements[-1][1]
 
-def main(input):
+def pair_transitions(elements, rules):
+    """
+    Encode the rules as a sparse transition matrix over pairs of elements, where the pair (l, r)
+    has index l * len(elements) + r. Each step adds the count of pair sources[k] to pair
+    targets[k]: a pair with a rule becomes its left and right halves, other pairs are unchanged.
+    >>> pair_transitions('BN', [('NN', 'B')])
+    (array([0, 1, 2, 3, 3]), array([0, 1, 2, 2, 1]))
+    """
+    index = {element: i for i, element in enumerate(elements)}
+    insertions = dict(rules)
+    sources, targets = [], []
+    for left, right in product(elements, repeat=2):
+        pair = index[left] * len(elements) + index[right]
+        if insertion := insertions.get(f"{left}{right}"):
+            sources += [pair, pair]
+            targets += [
+                index[left] * len(elements) + index[insertion],
+                index[insertion] * len(elements) + index[right],
+            ]
+        else:
+            sources.append(pair)
+            targets.append(pair)
+    return np.array(sources), np.array(targets)
+
+
+def apply_transitions(pair_counts, transitions):
+    sources, targets = transitions
+    new_pair_counts = np.zeros_like(pair_counts)
+    np.add.at(new_pair_counts, targets, pair_counts[sources])
+    return new_pair_counts
+
+
+def transition_matrix(elements, transitions):
+    """
+    The dense form of the sparse transitions, where matrix[i, j] is how many of pair i one pair j
+    becomes after a step, with exact python ints so that its powers can't overflow.
+    >>> transition_matrix('BN', pair_transitions('BN', [('NN', 'B')])).tolist()
+    [[1, 0, 0, 0], [0, 1, 0, 1], [0, 0, 1, 1], [0, 0, 0, 0]]
+    """
+    sources, targets = transitions
+    matrix = np.zeros((len(elements) ** 2, len(elements) ** 2), dtype=object)
+    np.add.at(matrix, (targets, sources), 1)
+    return matrix
+
+
+def apply_power(matrix, vector, n):
+    """
+    Apply matrix n times to vector by exponentiation by squaring, in O(log n) matrix products.
+    >>> apply_power(np.array([[1, 1], [1, 0]], dtype=object), np.array([1, 0], dtype=object), 100)
+    array([573147844013817084101, 354224848179261915075], dtype=object)
+    """
+    while n:
+        if n & 1:
+            vector = matrix @ vector
+        n >>= 1
+        if n:
+            matrix = matrix @ matrix
+    return vector
+
+
+def matrix_score(pair_counts, elements, template_last):
+    """
+    Like score, for a pair count vector. Every element is the left of exactly one pair, except the
+    last element of the template.
+    """
+    element_counts = pair_counts.reshape(len(elements), len(elements)).sum(axis=1)
+    element_counts[elements.index(template_last)] += 1
+    element_counts = element_counts[element_counts > 0]
+    return max(element_counts) - min(element_counts)
+
+
+def summarize(n):
+    """
+    n in full, or just its bit length once it's too long to be worth printing (converting huge
+    ints to str is quadratic, and refused past sys.get_int_max_str_digits()).
+    >>> summarize(1588)
+    '1588'
+    >>> summarize(1 << 20000)
+    '<20001-bit integer>'
+    """
+    return str(n) if n.bit_length() <= 1000 else f'<{n.bit_length()}-bit integer>'
+
+
+def main(input, steps=40, mode='matrix'):
+    """
+    >>> main("AB\\n\\nAA -> A\\nAB -> A\\nBA -> A\\nBB -> A", 20000, 'power').bit_length()
+    after 20000 iter template='AB', result=<20000-bit integer>
+    20000
+    """
     lines = input.splitlines()
     template, rules = lines[0], lines[2:]
     rules = [tuple(r.split(' -> ')) for r in rules]
-    pair_count = Counter([f'{l}{r}' for l, r in windowed(template, 2)])
-    for i in range(40):
-        print(f"{i=} {score(pair_count, template[0], template[-1])} {pair_count=}")
-        pair_count = apply_rules(pair_count, rules)
-        if i+1 == 10:
-            print(f"after 10 iter {score(pair_count, template[0], template[-1])=}")
-    print(f"after 40 iter {template=}, {score(pair_count, template[0], template[-1])=}")
+    if mode in ['matrix', 'power']:
+        elements = ''.join(sorted({*template, *chain.from_iterable(map(''.join, rules))}))
+        transitions = pair_transitions(elements, rules)
+        # object dtype keeps exact python ints, since counts overflow int64 after about 60 steps
+        pair_counts = np.zeros(len(elements) ** 2, dtype=object)
+        for l, r in windowed(template, 2):
+            pair_counts[elements.index(l) * len(elements) + elements.index(r)] += 1
+        if mode == 'power':
+            pair_counts = apply_power(transition_matrix(elements, transitions), pair_counts, steps)
+        else:
+            for i in range(steps):
+                pair_counts = apply_transitions(pair_counts, transitions)
+                if i+1 == 10:
+                    print(f"after 10 iter {matrix_score(pair_counts, elements, template[-1])=}")
+        result = matrix_score(pair_counts, elements, template[-1])
+    else:
+        pair_count = Counter([f'{l}{r}' for l, r in windowed(template, 2)])
+        for i in range(steps):
+            print(f"{i=} {score(pair_count, template[0], template[-1])} {pair_count=}")
+            pair_count = apply_rules(pair_count, rules)
+            if i+1 == 10:
+                print(f"after 10 iter {score(pair_count, template[0], template[-1])=}")
+        result = score(pair_count, template[0], template[-1])
+    print(f"after {steps} iter {template=}, result={summarize(result)}")
+    return result
 
 if __name__ == "__main__":
     EXAMPLE = """NNCB
@@ -1,8 +1,12 @@
+import sys
 import numpy as np
+from array import array
 from pathfinding.core.diagonal_movement import DiagonalMovement
 from pathfinding.core.grid import Grid
 from pathfinding.finder.a_star import AStarFinder
 from functools import partial
+from timeit import default_timer
+from heapq import heappop, heappush
 
 
 def wrapping_increment(n):
@@ -24,37 +28,231 @@ def wrapping_increment_by(n, m):
     1
     >>> wrapping_increment_by(9, 2)
     2
+    >>> wrapping_increment_by(9, 10)
+    1
+    >>> wrapping_increment_by(np.array([1, 8, 9]), np.array([[0], [2], [18]])).tolist()
+    [[1, 8, 9], [3, 1, 2], [1, 8, 9]]
+    """
+    return (n + m - 1) % 9 + 1
+
+class TiledCosts:
     """
-    return (n + m) % 10 + (1 if (n + m > 9) else 0)
+    A lazy view of the base matrix tiled along both axes, where each tile is incremented (with
+    wrapping) by its distance in tiles from the top left tile. Costs are computed on demand, so the
+    expanded matrix is never allocated unless it is converted with np.asarray.
+    >>> tiled = TiledCosts(np.array([[8, 9]]), 3)
+    >>> tiled.shape, tiled[2, 1], tiled.flat[2]
+    ((3, 6), 2, 9)
+    """
+
+    def __init__(self, base, tiles):
+        self.base = base
+        self.tiles = tiles
+        self.shape = (base.shape[0] * tiles, base.shape[1] * tiles)
+        self.flat = self.FlatView(self)
+
+    def __getitem__(self, index):
+        i, j = index
+        h, w = self.base.shape
+        return wrapping_increment_by(int(self.base[i % h, j % w]), i // h + j // w)
+
+    def __array__(self, dtype=None, copy=None):
+        # broadcast the base against each tile's increment as (tile row, row, tile column, column)
+        tile = np.arange(self.tiles)
+        matrix = wrapping_increment_by(
+            self.base[None, :, None, :], (tile[:, None] + tile)[:, None, :, None]
+        ).reshape(self.shape)
+        return matrix if dtype is None else matrix.astype(dtype)
+
+    class FlatView:
+        """
+        Costs of a TiledCosts by flat index, like ndarray.flat.
+        """
+
+        def __init__(self, tiled):
+            self.base = tiled.base.ravel().tolist()
+            self.h, self.w = tiled.base.shape
+            self.width = tiled.shape[1]
+
+        def __getitem__(self, n):
+            i, j = divmod(n, self.width)
+            ti, i = divmod(i, self.h)
+            tj, j = divmod(j, self.w)
+            # wrapping_increment_by, inlined since this is called for every edge relaxation
+            return (self.base[i * self.w + j] + ti + tj - 1) % 9 + 1
+
+
+def flat_costs(matrix):
+    """
+    Costs of the matrix indexable by flat index: a list for an ndarray, or the lazy view of a
+    TiledCosts.
+    """
+    if isinstance(matrix, TiledCosts):
+        return matrix.flat
+    return matrix.ravel().tolist()
+
+
+def neighbours(n, h, w):
+    """
+    Flat indices of the orthogonal neighbours of the flat index n in an h x w grid.
+    >>> sorted(neighbours(4, 3, 3))
+    [1, 3, 5, 7]
+    >>> sorted(neighbours(0, 3, 3))
+    [1, 3]
+    """
+    i, j = divmod(n, w)
+    if i > 0:
+        yield n - w
+    if i < h - 1:
+        yield n + w
+    if j > 0:
+        yield n - 1
+    if j < w - 1:
+        yield n + 1
+
+
+def unwind_path(previous, end, w):
+    """
+    Follow the `previous` flat indices back from end, giving the path as (x, y) tuples like
+    pathfinding does.
+    """
+    path = []
+    while end != -1:
+        path.append((end % w, end // w))
+        end = previous[end]
+    return path[::-1]
+
 
-def cheapest_path(matrix):
+def dijkstra(matrix, return_path=False):
+    """
+    Cost of the cheapest path from the top left to the bottom right, using a heapq priority queue
+    over flat indices of the matrix.
+    >>> dijkstra(np.array([[1, 9], [1, 1]]))
+    2
+    >>> dijkstra(np.array([[1, 9], [1, 1]]), return_path=True)
+    (2, [(0, 0), (0, 1), (1, 1)])
+    """
+    h, w = matrix.shape
+    costs = flat_costs(matrix)
+    end = h * w - 1
+    # typed arrays keep the per-cell bookkeeping at 8 bytes, for tilings too big for lists
+    distances = array('q', [sys.maxsize]) * (h * w)
+    distances[0] = 0
+    previous = array('q', [-1]) * (h * w if return_path else 0)
+    queue = [(0, 0)]
+    while queue:
+        distance, n = heappop(queue)
+        if n == end:
+            break
+        # skip stale queue entries, which were superseded by a shorter distance
+        if distance > distances[n]:
+            continue
+        for m in neighbours(n, h, w):
+            if (new_distance := distance + costs[m]) < distances[m]:
+                distances[m] = new_distance
+                if return_path:
+                    previous[m] = n
+                heappush(queue, (new_distance, m))
+    if return_path:
+        return distances[end], unwind_path(previous, end, w)
+    return distances[end]
+
+
+def dial(matrix, return_path=False):
+    """
+    Cost of the cheapest path from the top left to the bottom right, using Dial's algorithm. Every
+    cost is between 1 and 9, so queued distances never span more than 10 values, and a circular
+    array of 10 buckets indexed by distance modulo 10 replaces the priority queue.
+    >>> dial(np.array([[1, 9], [1, 1]]))
+    2
+    >>> dial(np.array([[1, 9], [1, 1]]), return_path=True)
+    (2, [(0, 0), (0, 1), (1, 1)])
+    """
+    h, w = matrix.shape
+    costs = flat_costs(matrix)
+    end = h * w - 1
+    distances = array('q', [sys.maxsize]) * (h * w)
+    distances[0] = 0
+    previous = array('q', [-1]) * (h * w if return_path else 0)
+    buckets = [[] for _ in range(10)]
+    buckets[0].append(0)
+    # once the buckets are emptied up to the end's distance, the end's distance is final
+    distance = 0
+    while distance < distances[end]:
+        bucket = buckets[distance % 10]
+        while bucket:
+            n = bucket.pop()
+            # skip stale bucket entries, which were superseded by a shorter distance
+            if distances[n] != distance:
+                continue
+            for m in neighbours(n, h, w):
+                if (new_distance := distance + costs[m]) < distances[m]:
+                    distances[m] = new_distance
+                    if return_path:
+                        previous[m] = n
+                    buckets[new_distance % 10].append(m)
+        distance += 1
+    if return_path:
+        return distances[end], unwind_path(previous, end, w)
+    return distances[end]
+
+
+def astar(matrix, return_path=False):
+    """
+    Cost of the cheapest path from the top left to the bottom right, using pathfinding's A*.
+    >>> astar(np.array([[1, 9], [1, 1]]))
+    2
+    """
+    matrix = np.asarray(matrix)
     grid = Grid(matrix=matrix)
     start = grid.node(0, 0)
     end = grid.node(grid.width - 1, grid.height - 1)
     finder = AStarFinder(diagonal_movement=DiagonalMovement.never)
     path, _ = finder.find_path(start, end, grid)
+    path = [(x, y) for x, y in path]
+    cost = int(sum(matrix[j, i] for i,j in path[1:]))
+    if return_path:
+        return cost, path
+    return cost
+
+
+def cheapest_path(matrix, engine=dijkstra, display=False):
+    if not display:
+        return engine(matrix)
+    cost, path = engine(matrix, return_path=True)
+    grid = Grid(matrix=np.asarray(matrix))
+    start = grid.node(0, 0)
+    end = grid.node(grid.width - 1, grid.height - 1)
     print(grid.grid_str(path=path, start=start, end=end))
     print(path[:10], path[-10:])
-    cost = sum(matrix[j, i] for i,j in path[1:])
     return cost
 
 
-def main(input):
+def main(input, tiles=5):
     matrix = np.array([[*map(int, line)] for line in input.splitlines()])
-    cost = cheapest_path(matrix)
+    cost = cheapest_path(matrix, display=True)
     print(f"part 1: {cost=}")
 
     # Expand the matrix
-    for axis in range(2):
-        matrix = np.concatenate([
-            np.vectorize(lambda n: wrapping_increment_by(n, i))(matrix)
-            for i in range(5)
-        ], axis=axis)
-
-    cost = cheapest_path(matrix)
+    cost = cheapest_path(TiledCosts(matrix, tiles))
     print(f"part 2: {cost=}")
 
 
+def benchmark(matrices, engines=(astar, dijkstra, dial), astar_limit=500 * 500):
+    """
+    Time each engine on each named matrix. A* is skipped above astar_limit cells, since
+    pathfinding's object graph takes too long and too much memory to build.
+    """
+    for name, matrix in matrices.items():
+        size = matrix.shape[0] * matrix.shape[1]
+        for engine in engines:
+            if engine is astar and size > astar_limit:
+                print(f"{name:>20} {engine.__name__:>8}: skipped")
+                continue
+            start = default_timer()
+            cost = engine(matrix)
+            print(f"{name:>20} {engine.__name__:>8}: {cost=} in {default_timer() - start:.3f}s")
+
 
 if __name__ == "__main__":
     EXAMPLE = """1163751742
@@ -268,6 +466,19 @@ if __name__ == "__main__":
 2111697733928869231956532219642919971371939921939182129518341429926954783299694818222137624318218193
 7918331918611351816139112921322828652131814891298482791235912154914156276127996537498197874799924122
 7836996594939159837193584991869184956399715111271353229592112889346822858939489744779468277719668577"""
-    # main(EXAMPLE)
-    main(INPUT)
-    # main(CHJ_INPUT)
+    if sys.argv[1:] == ['benchmark']:
+        example, input = (
+            np.array([[*map(int, line)] for line in text.splitlines()])
+            for text in [EXAMPLE, INPUT]
+        )
+        benchmark({
+            'example': example,
+            'example x5': TiledCosts(example, 5),
+            'input': input,
+            'input x5': TiledCosts(input, 5),
+            'random 2000x2000': np.random.default_rng(15).integers(1, 10, (2000, 2000)),
+        })
+    else:
+        # main(EXAMPLE)
+        main(INPUT)
+        # main(CHJ_INPUT)
@@ -1,24 +1,224 @@
 import numpy as np
+from functools import lru_cache
 from itertools import product
 from more_itertools import split_at
 
 
+def neighbourhood_index(pad, out=None):
+    """
+    Compute the 9-bit enhancer address of every pixel that has a full 3x3 neighbourhood in `pad`,
+    by shifting in one bit per neighbour from a sliced view of the padded image.
+    >>> neighbourhood_index(np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]])).tolist()
+    [[34]]
+    """
+    h, w = pad.shape[0] - 2, pad.shape[1] - 2
+    index = np.zeros((h, w), dtype=np.int16) if out is None else out
+    index[...] = 0
+    for di, dj in product(range(3), repeat=2):
+        index <<= 1
+        index |= pad[di:di+h, dj:dj+w]
+    return index
+
+
 def enhance(inp, enhancer, pad_value):
     pad = np.pad(inp, (3,3,), constant_values=(pad_value,))
-    out = np.zeros((pad.shape[0]-2, pad.shape[1]-2), dtype=np.int8)
-    print(f'{pad_value=}')
-    display(pad)
-    # return np.array([
-    #     inp.get((x, y), 0)
-    #     for x, y in np.ndindex(inp.shape)
-    # ])
-    for i, j in np.ndindex(out.shape):
-        address = ""
-        for di, dj in product(range(3), repeat=2):
-            address += str(pad[i+di, j+dj])
-        # print(f"{i=}, {j=}, addr={int(address, 2)} ({address}). enh={enhancer[int(address, 2)]}")
-        out[i, j] = enhancer[int(address, 2)]
-    return out
+    return np.asarray(enhancer, dtype=np.int8)[neighbourhood_index(pad)]
+
+
+class InfiniteImage:
+    """
+    An image on an infinite plane: a finite window of interesting pixels, surrounded by a
+    background which is either all lit or all dark.
+
+    The window lives inside a buffer whose margin is filled with the background bit. Each
+    enhancement grows the window by one pixel per side, and the buffer only doubles when the
+    margin runs out, so long runs of enhancements don't reallocate every step.
+    >>> image = InfiniteImage(np.array([[1]]))
+    >>> image.enhance(np.arange(512) % 2)
+    >>> image.window.tolist(), image.background
+    ([[1, 0, 0], [0, 0, 0], [0, 0, 0]], 0)
+    """
+
+    # background pixels needed around the window to compute the next ring of pixels
+    MARGIN = 2
+
+    def __init__(self, pixels, background=0):
+        self.background = background
+        self.top, self.left = 0, 0
+        self.height, self.width = pixels.shape
+        self.buffer = np.full((0, 0), background, dtype=np.int8)
+        self._grow(pixels)
+
+    @property
+    def window(self):
+        return self.buffer[self.top:self.top+self.height, self.left:self.left+self.width]
+
+    def _grow(self, pixels):
+        """
+        Move `pixels` into the middle of a buffer at least twice as big, so there is room for
+        as many enhancements as the window is wide before growing again.
+        """
+        capacity = tuple(
+            max(2 * current, 2 * (size + 2 * self.MARGIN))
+            for current, size in zip(self.buffer.shape, pixels.shape)
+        )
+        self.buffer = np.full(capacity, self.background, dtype=np.int8)
+        self.spare = np.empty_like(self.buffer)
+        self.index = np.empty(capacity, dtype=np.int16)
+        self.top = (capacity[0] - self.height) // 2
+        self.left = (capacity[1] - self.width) // 2
+        self.window[...] = pixels
+
+    def enhance(self, enhancer):
+        if min(
+            self.top, self.left,
+            self.buffer.shape[0] - self.top - self.height,
+            self.buffer.shape[1] - self.left - self.width,
+        ) < self.MARGIN:
+            self._grow(self.window.copy())
+        top, left, height, width = self.top - 1, self.left - 1, self.height + 2, self.width + 2
+        index = neighbourhood_index(
+            self.buffer[top-1:top+height+1, left-1:left+width+1],
+            out=self.index[:height, :width]
+        )
+        # the background is uniform, so every background pixel has an address of all 0s or all 1s
+        self.background = int(enhancer[511 * self.background])
+        self.spare.fill(self.background)
+        self.spare[top:top+height, left:left+width] = enhancer[index]
+        self.buffer, self.spare = self.spare, self.buffer
+        self.top, self.left, self.height, self.width = top, left, height, width
+
+    def count(self):
+        """
+        The number of lit pixels, which is infinite if the background is lit.
+        """
+        return float('inf') if self.background else int(self.window.sum())
+
+
+@lru_cache
+def compile_enhancer(enhancer):
+    """
+    Compile an enhancer lookup table into a circuit of multiplexer gates over the 9 neighbour bits
+    (most significant first), by splitting the table in half on one bit at a time and sharing
+    identical sub-tables. Nodes 0 and 1 are constant dark and lit, gate n is node n + 2.
+    >>> compile_enhancer(tuple((i >> 4) & 1 for i in range(512)))
+    ([(4, 1, 0)], 2)
+    """
+    gates = []
+    nodes = {}
+
+    def node(table):
+        if not any(table):
+            return 0
+        if all(table):
+            return 1
+        if table not in nodes:
+            half = len(table) // 2
+            low, high = node(table[:half]), node(table[half:])
+            if low == high:
+                return low
+            gates.append((10 - len(table).bit_length(), high, low))
+            nodes[table] = len(gates) + 1
+        return nodes[table]
+
+    return gates, node(enhancer)
+
+
+class PackedImage:
+    """
+    An image on an infinite plane, packed into the bits of a single Python int: a canvas of
+    background pixels, `stride` pixels wide, with pixel (i, j) at bit i * stride + j.
+
+    Enhancing is word-parallel over the whole canvas: each of the 9 neighbours of every pixel is a
+    shifted copy of the canvas, and these 9 bit planes are fed through the enhancer compiled into
+    multiplexer gates, so each step is a few big-int operations per gate and no pixel (or row) is
+    ever looked at individually. Shifts wrap around at the canvas edges, so its border ring is
+    reset to the background after each step, and the canvas is repacked larger when the window gets
+    too close to it.
+
+    On the puzzle input (a circuit of about 130 gates) this keeps pace with InfiniteImage for a few
+    hundred steps, but by 1000 steps it is about 1.3x slower, as every gate costs 3 big-int
+    operations over the whole canvas.
+    >>> image = PackedImage(np.array([[1]]))
+    >>> image.enhance(np.arange(512) % 2)
+    >>> image.window.tolist(), image.background
+    ([[1, 0, 0], [0, 0, 0], [0, 0, 0]], 0)
+    """
+
+    # background pixels needed around the window to compute the next ring of pixels, inside the
+    # border ring
+    MARGIN = 2
+
+    def __init__(self, pixels, background=0):
+        self.background = background
+        self._grow(np.asarray(pixels, dtype=np.uint8))
+
+    @staticmethod
+    def _pack(pixels):
+        return int.from_bytes(np.packbits(pixels, axis=None, bitorder='little').tobytes(), 'little')
+
+    @property
+    def window(self):
+        pixels = np.unpackbits(
+            np.frombuffer(self.bits.to_bytes((self.ones.bit_length() + 7) // 8, 'little'), dtype=np.uint8),
+            count=self.ones.bit_length(), bitorder='little',
+        ).reshape(self.canvas_shape)
+        return pixels[self.top:self.top+self.height, self.left:self.left+self.width].astype(np.int8)
+
+    def _grow(self, pixels):
+        """
+        Repack `pixels` into the middle of a canvas with room for about size / 16 enhancements.
+        Unlike InfiniteImage._grow this doesn't double, since every big-int operation costs as much
+        as the whole canvas, while repacking costs only about as much as one of them.
+        """
+        self.height, self.width = pixels.shape
+        self.canvas_shape = tuple(
+            size + 2 * (self.MARGIN + max(self.MARGIN, size // 16)) for size in pixels.shape
+        )
+        self.top = (self.canvas_shape[0] - self.height) // 2
+        self.left = (self.canvas_shape[1] - self.width) // 2
+        canvas = np.full(self.canvas_shape, self.background, dtype=np.uint8)
+        canvas[self.top:self.top+self.height, self.left:self.left+self.width] = pixels
+        border = np.ones(self.canvas_shape, dtype=np.uint8)
+        border[1:-1, 1:-1] = 0
+        self.bits, self.border = self._pack(canvas), self._pack(border)
+        self.ones = (1 << canvas.size) - 1
+
+    def enhance(self, enhancer):
+        if min(
+            self.top, self.left,
+            self.canvas_shape[0] - self.top - self.height,
+            self.canvas_shape[1] - self.left - self.width,
+        ) < self.MARGIN:
+            self._grow(self.window)
+        gates, output = compile_enhancer(tuple(int(x) for x in enhancer))
+        stride = self.canvas_shape[1]
+        # the plane of each neighbour, from the top left, moved onto the pixels it neighbours
+        planes = [
+            (self.bits >> offset if offset >= 0 else self.bits << -offset) & self.ones
+            for offset in (di * stride + dj for di, dj in product([-1, 0, 1], repeat=2))
+        ]
+        self.background = int(enhancer[511 * self.background])
+        bits = self._evaluate(gates, output, planes, self.ones)
+        self.bits = (bits | self.border) ^ (0 if self.background else self.border)
+        self.top, self.left, self.height, self.width = (
+            self.top - 1, self.left - 1, self.height + 2, self.width + 2
+        )
+
+    @staticmethod
+    def _evaluate(gates, output, planes, ones):
+        values = [0, ones]
+        for bit, high, low in gates:
+            # high where the plane is set and low elsewhere, without ~plane, which is negative and
+            # so much slower as a big int
+            values.append(values[low] ^ ((values[low] ^ values[high]) & planes[bit]))
+        return values[output]
+
+    def count(self):
+        """
+        The number of lit pixels, which is infinite if the background is lit.
+        """
+        return float('inf') if self.background else bin(self.bits).count('1')
 
 
 def display(inp):
@@ -26,24 +226,23 @@ def display(inp):
     for line in inp:
         print(''.join([['.','#'][int(x)] for x in line]))
 
-def main(input):
+def main(input, steps=50, image_type=InfiniteImage):
     enhance_lines, inp_lines, *_ = split_at(input.splitlines(), lambda x: not x)
     print(f"{enhance_lines=}\n{inp_lines=}")
-    enhancer = [['.', '#'].index(x) for x in ''.join(enhance_lines)]
+    enhancer = np.array([['.', '#'].index(x) for x in ''.join(enhance_lines)], dtype=np.int8)
     print(f"{len(enhancer)}, {enhancer=}")
     inp = np.array([
         [['.', '#'].index(x) for x in line]
         for line in inp_lines
-    ])
-    for i in range(50):
-        # dumb hack to deal with enhancer starting with '#'.
-        pad_value = (i % 2) * enhancer[0]
-        print(f"{i=}, {pad_value=}")
-        display(inp)
-        inp = enhance(inp, enhancer, pad_value)
-    display(inp)
+    ], dtype=np.int8)
+    image = image_type(inp)
+    display(image.window)
+    for i in range(steps):
+        image.enhance(enhancer)
+    display(image.window)
     # count the number of '#'
-    print(f"{np.sum(inp)=}")
+    print(f"{image.count()=}")
+    return image.count()
 
 
 